@@ -4,39 +4,350 @@ Advanced NARPM Members API Scraper
 Full-featured version with CSV export, logging, and comprehensive error handling
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import ijson
+import orjson
+import zstandard as zstd
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import csv
+import io
 import os
-from typing import List, Dict, Optional
+import queue
+import sys
+from multiprocessing import Pool
+from typing import Any, List, Dict, Optional, Tuple
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
+def setup_logging() -> QueueListener:
+    """
+    Set up logging so callers only enqueue records and a background thread formats and writes them
+    
+    Returns:
+        The started listener, to be passed to stop_logging once scraping is done
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [
         logging.FileHandler('narpm_scraper.log'),
         logging.StreamHandler()
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    return listener
+
+def stop_logging(listener: QueueListener):
+    """Detach the queue handler, drain the queued records and close the log file"""
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root_logger.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
 logger = logging.getLogger(__name__)
 
+# Pages with at least this many records are parsed incrementally with ijson
+STREAM_PARSE_MIN_LIMIT = 100
+
+# Non-streamed CSV exports at least this large are encoded across worker processes. main() always
+# streams CSV while scraping, so this only applies when save_to_csv is called on its own
+PARALLEL_CSV_MIN_ROWS = 100_000
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# Longest wait honoured from a Retry-After header, in seconds
+RETRY_AFTER_MAX = 120
+
+class RetryableHTTPError(Exception):
+    """Raised for HTTP statuses in RETRY_STATUSES so the async fetch can be retried"""
+    
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header, given as seconds or an HTTP date, into seconds to wait"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+# Server errors back off from 1s; rate limiting without a Retry-After backs off from 10s as the sync scraper did
+_server_error_wait = wait_exponential_jitter(multiplier=1, max=60)
+_rate_limit_wait = wait_exponential_jitter(multiplier=10, max=60)
+
+def _retry_wait(retry_state) -> float:
+    """tenacity wait honouring Retry-After, falling back to exponential backoff with jitter"""
+    error = retry_state.outcome.exception()
+    if isinstance(error, RetryableHTTPError):
+        if error.retry_after is not None:
+            return min(error.retry_after, RETRY_AFTER_MAX)
+        if error.status == 429:
+            return _rate_limit_wait(retry_state)
+    return _server_error_wait(retry_state)
+
+# zstd level for compressed outputs (files whose name ends in .zst)
+ZSTD_LEVEL = 3
+
+def _open_output(filename: str, mode: str = 'wb'):
+    """Open a binary output file, compressing with zstd when the name ends in .zst"""
+    fh = open(filename, mode, buffering=1 << 20)
+    if filename.endswith('.zst'):
+        return zstd.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).stream_writer(fh, closefd=True)
+    return fh
+
+def _encode_csv_chunk(args: Tuple[List[Dict], List[str]]) -> Tuple[str, List[Tuple[int, str, Any]]]:
+    """
+    Encode a chunk of records as CSV text in a worker process
+    
+    Args:
+        args: (records, header) tuple
+        
+    Returns:
+        (csv_text, extras) where extras are (chunk_row, field, value) triples for fields outside the header
+    """
+    records, header = args
+    header_keys = set(header)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    extras = []
+    for row, record in enumerate(records):
+        writer.writerow([record.get(key, '') for key in header])
+        for key in sorted(record.keys() - header_keys):
+            extras.append((row, key, record[key]))
+    return buffer.getvalue(), extras
+
+class _PageStreamParser:
+    """
+    Push parser that rebuilds a page body from chunks as they arrive
+    
+    Records in a top-level list, or in the envelope's 'data' list, are built one at a
+    time straight into the result, so the raw body is never held whole. Other top-level
+    values are small and are built as usual. The result equals a full JSON decode.
+    """
+    
+    def __init__(self):
+        self._events = ijson.sendable_list()
+        self._coro = ijson.parse_coro(self._events, use_float=True)
+        self.value = None
+        self._started = False
+        self._key = None  # Current top-level key of an object body
+        self._records = None  # List receiving records while inside it
+        self._builder = None
+        self._depth = 0
+    
+    def feed(self, chunk: bytes):
+        """Parse the next chunk of the body"""
+        self._coro.send(chunk)
+        self._drain()
+    
+    def close(self):
+        """Finish parsing and return the decoded body; raises on a truncated body"""
+        self._coro.close()
+        self._drain()
+        return self.value
+    
+    def _drain(self):
+        for prefix, event, value in self._events:
+            self._event(event, value)
+        del self._events[:]
+    
+    def _build(self, event: str, value) -> bool:
+        """Feed one event to the current value builder; True once that value is complete"""
+        if self._builder is None:
+            self._builder = ijson.ObjectBuilder()
+        self._builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            self._depth += 1
+        elif event in ('end_map', 'end_array'):
+            self._depth -= 1
+        return self._depth == 0
+    
+    def _take(self):
+        value, self._builder = self._builder.value, None
+        return value
+    
+    def _event(self, event: str, value):
+        if not self._started:
+            self._started = True
+            if event == 'start_array':
+                self.value = self._records = []
+            elif event == 'start_map':
+                self.value = {}
+            else:
+                self.value = value  # Bare scalar
+            return
+        
+        if self._records is not None:
+            if self._builder is None and event == 'end_array':
+                self._records = None  # End of the records list
+            elif self._build(event, value):
+                self._records.append(self._take())
+            return
+        
+        if self._builder is not None:
+            if self._build(event, value):
+                self.value[self._key] = self._take()
+            return
+        
+        # Top level of an object body
+        if event == 'map_key':
+            self._key = value
+        elif event == 'end_map':
+            pass
+        elif self._key == 'data' and event == 'start_array':
+            self.value['data'] = self._records = []
+        elif self._build(event, value):
+            self.value[self._key] = self._take()
+
+class RateLimiter:
+    """Token bucket limiter allowing short bursts while capping the long-run request rate"""
+    
+    def __init__(self, rate: float, max_tokens: int = 5):
+        """
+        Initialize the token bucket
+        
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            max_tokens: Bucket size, i.e. the largest allowed burst
+        """
+        self.rate = rate
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+    
+    def add_new_tokens(self):
+        """Refill the bucket based on the time elapsed since the last refill"""
+        now = time.monotonic()
+        new_tokens = (now - self.updated_at) * self.rate
+        if new_tokens > 0:
+            self.tokens = min(self.tokens + new_tokens, self.max_tokens)
+            self.updated_at = now
+    
+    def _take_token(self) -> bool:
+        self.add_new_tokens()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+    
+    def wait_for_token(self):
+        """Block until a token is available, then consume it"""
+        while not self._take_token():
+            time.sleep(0.05)
+    
+    async def wait_for_token_async(self):
+        """Async version of wait_for_token that yields to the event loop while waiting"""
+        while not self._take_token():
+            await asyncio.sleep(0.05)
+
+class AdaptiveConcurrencyLimiter:
+    """Vegas-style cap on in-flight requests that grows while RTT stays flat and shrinks when it rises"""
+    
+    def __init__(self, max_limit: int, initial_limit: int = 2, smoothing: float = 0.2, tolerance: float = 1.1):
+        """
+        Initialize the adaptive limiter
+        
+        Args:
+            max_limit: Hard ceiling on concurrent requests
+            initial_limit: Concurrency to start with before any RTT is observed
+            smoothing: EWMA weight given to each new RTT sample
+            tolerance: RTT inflation over the best seen RTT that still counts as "flat"
+        """
+        self.max_limit = max_limit
+        self.limit = max(1, min(initial_limit, max_limit))
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.min_rtt: Optional[float] = None
+        self.rtt_ewma: Optional[float] = None
+        self._cond = asyncio.Condition()
+    
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+    
+    def record_rtt(self, rtt: float):
+        """Feed a response time sample and adjust the limit by the Vegas rule"""
+        self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+        if self.rtt_ewma is None:
+            self.rtt_ewma = rtt
+        else:
+            self.rtt_ewma = (1 - self.smoothing) * self.rtt_ewma + self.smoothing * rtt
+        
+        if self.rtt_ewma < self.tolerance * self.min_rtt:
+            self.limit = min(self.limit + 1, self.max_limit)
+        else:
+            self.limit = max(1, self.limit - 1)
+    
+    def record_overload(self):
+        """Halve the limit after a rate-limit, server error or timeout"""
+        self.limit = max(1, self.limit // 2)
+
 class NARPMScraper:
-    def __init__(self, limit: int = 20, delay: float = 0.8):
+    def __init__(self, limit: int = 20, delay: float = 0.8, concurrency: int = 8,
+                 cache_ttl_seconds: int = 24 * 3600, cache_dir: str = ".narpm_cache"):
         """
         Initialize the NARPM scraper
         
         Args:
             limit: Records per API call (20 for balanced performance)
-            delay: Delay between API calls in seconds
+            delay: Minimum average delay between API calls in seconds (caps the rate at 1/delay, 0 disables)
+            concurrency: Upper bound on API calls in flight; the actual level adapts to observed RTT
+            cache_ttl_seconds: How long cached page responses stay valid (0 disables the cache)
+            cache_dir: Directory holding cached page responses
         """
         self.base_url = "https://api.blankethomes.com/narpm-members"
         self.limit = limit
         self.delay = delay
+        self.concurrency = concurrency
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_dir = cache_dir
         self.all_data = []
+        self.jsonl_filename: Optional[str] = None
+        self._jsonl_fp = None
+        self.csv_filename: Optional[str] = None
+        self._csv_header: Optional[List[str]] = None
+        self._csv_header_written = False
+        self._csv_rows = 0
+        self._csv_fp = None
+        self._csv_writer = None
+        self._csv_extras_fp = None
+        self._csv_extras_writer = None
+        self.limiter = RateLimiter(rate=1.0 / delay, max_tokens=5) if delay > 0 else None
+        self._concurrency = AdaptiveConcurrencyLimiter(max_limit=concurrency)
+        self._http_version: Optional[str] = None
         
         self.headers = {
             'accept': 'application/json, text/plain, */*',
@@ -53,75 +364,256 @@ class NARPMScraper:
             'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36'
         }
     
-    def fetch_page(self, offset: int, retry_count: int = 0) -> Optional[Dict]:
+    def _make_client(self) -> httpx.AsyncClient:
+        """Build the HTTP/2 client that every API request goes through"""
+        # HTTP/2 multiplexes every request as a stream on one connection; the connection limit
+        # only comes into play if the server falls back to HTTP/1.1
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        return httpx.AsyncClient(http2=True, headers=self.headers, timeout=30, limits=limits)
+    
+    def _cache_path(self, offset: int) -> str:
+        """Path of the cached response for a page, keyed by offset and limit"""
+        return os.path.join(self.cache_dir, f"o{offset}_l{self.limit}.json")
+    
+    def _read_cache(self, offset: int) -> Optional[Dict]:
+        """Return the cached response for a page if present and not expired"""
+        if self.cache_ttl_seconds <= 0:
+            return None
+        
+        cache_path = self._cache_path(offset)
+        try:
+            if time.time() - os.path.getmtime(cache_path) > self.cache_ttl_seconds:
+                return None
+            with open(cache_path, 'rb') as f:
+                data = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        
+        logger.info(f"📦 Cache hit: offset={offset}, limit={self.limit}")
+        return data
+    
+    def _open_cache_tmp(self, offset: int):
+        """Open the temp file a page response is written to before it is moved into the cache"""
+        if self.cache_ttl_seconds <= 0:
+            return None
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return open(f"{self._cache_path(offset)}.tmp", 'wb')
+        except OSError as e:
+            logger.warning(f"Failed to cache offset={offset}: {str(e)}")
+            return None
+    
+    def _commit_cache(self, offset: int, fp):
+        """Close a cache temp file and atomically move it into place"""
+        try:
+            fp.close()
+            os.replace(fp.name, self._cache_path(offset))
+        except OSError as e:
+            logger.warning(f"Failed to cache offset={offset}: {str(e)}")
+    
+    @staticmethod
+    def _discard_cache(fp):
+        """Close and delete a cache temp file for a response that won't be cached"""
+        if fp is None:
+            return
+        fp.close()
+        try:
+            os.remove(fp.name)
+        except OSError:
+            pass
+    
+    def _write_cache(self, offset: int, body: bytes):
+        """Atomically store a raw page response in the cache"""
+        fp = self._open_cache_tmp(offset)
+        if fp is None:
+            return
+        try:
+            fp.write(body)
+        except OSError as e:
+            logger.warning(f"Failed to cache offset={offset}: {str(e)}")
+            self._discard_cache(fp)
+            return
+        self._commit_cache(offset, fp)
+    
+    def fetch_page(self, offset: int) -> Optional[Dict]:
         """
         Fetch a single page of data with retry logic
         
         Args:
             offset: Starting record number
-            retry_count: Current retry attempt
             
         Returns:
             API response data or None if failed
         """
-        url = f"{self.base_url}?offset={offset}&limit={self.limit}"
+        return asyncio.run(self._fetch_single_page_async(offset))
+    
+    async def _fetch_single_page_async(self, offset: int) -> Optional[Dict]:
+        """Fetch one page over a one-off client, outside of a full scrape"""
+        async with self._make_client() as client:
+            return await self._get_page_async(client, offset)
+    
+    @staticmethod
+    def _extract_records(page_data) -> List[Dict]:
+        """Normalize the different API response formats into a list of records with interned field names"""
+        if isinstance(page_data, dict) and 'data' in page_data:
+            records = page_data['data']
+            if not isinstance(records, list):
+                return []  # Malformed envelope, treat it as an empty page
+        elif isinstance(page_data, list):
+            records = page_data
+        else:
+            records = [page_data] if page_data else []
         
-        try:
-            logger.info(f"Fetching data: offset={offset}, limit={self.limit}")
-            
-            response = requests.get(url, headers=self.headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"✅ Successfully fetched {len(data.get('data', data)) if isinstance(data, (dict, list)) else 1} records")
-                return data
-            
-            elif response.status_code == 429:  # Rate limited
-                wait_time = min(10 * (2 ** retry_count), 60)  # Exponential backoff, max 60s
-                logger.warning(f"Rate limited. Waiting {wait_time}s before retry...")
-                time.sleep(wait_time)
-                if retry_count < 3:
-                    return self.fetch_page(offset, retry_count + 1)
-                return None
-            
-            elif response.status_code in [500, 502, 503, 504]:  # Server errors
-                if retry_count < 2:
-                    wait_time = 5 * (retry_count + 1)
-                    logger.warning(f"Server error {response.status_code}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    return self.fetch_page(offset, retry_count + 1)
-                else:
-                    logger.error(f"❌ Server error {response.status_code} after retries: {response.text}")
-                    return None
+        # Every record repeats the same field names; share one string object per name
+        return [
+            {sys.intern(key): value for key, value in record.items()} if isinstance(record, dict) else record
+            for record in records
+        ]
+    
+    @retry(
+        retry=retry_if_exception_type((RetryableHTTPError, httpx.TransportError)),
+        wait=_retry_wait,
+        stop=stop_after_attempt(5),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    async def _do_fetch_async(self, client: httpx.AsyncClient, offset: int) -> Optional[Dict]:
+        """
+        Make one GET for a page, raising on failures that are worth retrying
+        
+        Args:
+            client: Shared httpx client
+            offset: Starting record number
             
-            else:
+        Returns:
+            API response data, or None on a non-retryable HTTP error
+        """
+        if self.limiter is not None:
+            await self.limiter.wait_for_token_async()
+        
+        params = {'offset': offset, 'limit': self.limit}
+        started = time.monotonic()
+        try:
+            async with client.stream('GET', self.base_url, params=params) as response:
+                if self._http_version is None:
+                    self._http_version = response.http_version
+                    logger.info(f"🔗 Negotiated {response.http_version} with {response.url.host}")
+                
+                if response.status_code == 200:
+                    self._concurrency.record_rtt(time.monotonic() - started)
+                    body = None
+                    cache_fp = None
+                    if self.limit >= STREAM_PARSE_MIN_LIMIT:
+                        # Large pages are parsed as chunks arrive, and the raw chunks go straight to the cache
+                        cache_fp = self._open_cache_tmp(offset)
+                        try:
+                            parser = _PageStreamParser()
+                            async for chunk in response.aiter_bytes():
+                                parser.feed(chunk)
+                                if cache_fp is not None:
+                                    try:
+                                        cache_fp.write(chunk)
+                                    except OSError as e:
+                                        logger.warning(f"Failed to cache offset={offset}: {str(e)}")
+                                        self._discard_cache(cache_fp)
+                                        cache_fp = None
+                            data = parser.close()
+                        except BaseException:
+                            self._discard_cache(cache_fp)
+                            raise
+                    else:
+                        body = await response.aread()
+                        data = orjson.loads(body)
+                    
+                    # A malformed envelope is a failed page, and is kept out of the cache
+                    if isinstance(data, dict) and 'data' in data and not isinstance(data['data'], list):
+                        self._discard_cache(cache_fp)
+                        logger.error(f"❌ Malformed response (offset={offset}): 'data' is {type(data['data']).__name__}, not a list")
+                        return None
+                    
+                    if cache_fp is not None:
+                        self._commit_cache(offset, cache_fp)
+                    elif body is not None:
+                        self._write_cache(offset, body)
+                    return data
+                
+                if response.status_code in RETRY_STATUSES:
+                    self._concurrency.record_overload()
+                    raise RetryableHTTPError(response.status_code, _parse_retry_after(response.headers.get('Retry-After')))
+                
+                await response.aread()
                 logger.error(f"❌ HTTP {response.status_code}: {response.text[:200]}")
                 return None
-                
-        except requests.exceptions.Timeout:
-            logger.error("⏰ Request timed out")
-            if retry_count < 2:
-                time.sleep(2)
-                return self.fetch_page(offset, retry_count + 1)
-            return None
+        
+        except httpx.TimeoutException:
+            self._concurrency.record_overload()
+            raise
+    
+    async def _get_page_async(self, client: httpx.AsyncClient, offset: int) -> Optional[Dict]:
+        """
+        Fetch a page from the cache or the API, logging the outcome
+        
+        Args:
+            client: Shared httpx client
+            offset: Starting record number
             
-        except requests.exceptions.ConnectionError:
-            logger.error("🔌 Connection error")
-            if retry_count < 2:
-                time.sleep(5)
-                return self.fetch_page(offset, retry_count + 1)
+        Returns:
+            API response data or None if failed
+        """
+        cached = self._read_cache(offset)
+        if cached is not None:
+            return cached
+        
+        logger.info(f"Fetching data: offset={offset}, limit={self.limit}")
+        
+        try:
+            data = await self._do_fetch_async(client, offset)
+            if data is not None:
+                records = data.get('data', data) if isinstance(data, dict) else data
+                logger.info(f"✅ Successfully fetched {len(records) if isinstance(records, list) else 1} records")
+            return data
+        
+        except RetryableHTTPError as e:
+            logger.error(f"❌ HTTP {e.status} after retries (offset={offset})")
             return None
-            
+        
+        except httpx.TimeoutException:
+            logger.error(f"⏰ Request timed out after retries (offset={offset})")
+            return None
+        
+        except httpx.TransportError:
+            logger.error(f"🔌 Connection error after retries (offset={offset})")
+            return None
+        
         except Exception as e:
             logger.error(f"💥 Unexpected error: {str(e)}")
             return None
     
-    def scrape_all_pages(self, total_pages: int = 456) -> List[Dict]:
+    async def _fetch_page_async(self, client: httpx.AsyncClient, offset: int) -> Tuple[int, Optional[List[Dict]]]:
         """
-        Scrape all pages of data
+        Fetch one page under the adaptive concurrency limit
+        
+        Returns:
+            (offset, records) tuple, records is None if the page failed
+        """
+        async with self._concurrency:
+            page_data = await self._get_page_async(client, offset)
+        
+        if page_data is None:
+            return offset, None
+        return offset, self._extract_records(page_data)
+    
+    async def scrape_all_pages_async(self, total_pages: int = 456, jsonl_filename: Optional[str] = None,
+                                     csv_filename: Optional[str] = None) -> List[Dict]:
+        """
+        Scrape all pages concurrently over an HTTP/2 httpx client
         
         Args:
             total_pages: Total number of pages to scrape (default based on 456 * 12 records)
+            jsonl_filename: Optional JSON Lines file that records are appended to as pages arrive
+                (zstd-compressed when it ends in .zst)
+            csv_filename: Optional CSV file that rows are appended to as pages arrive
             
         Returns:
             List of all records
@@ -130,80 +622,177 @@ class NARPMScraper:
         estimated_total_records = total_pages * 12  # 5,472 records
         actual_pages = (estimated_total_records + self.limit - 1) // self.limit
         
-        logger.info(f"🚀 Starting to scrape with limit={self.limit}")
+        logger.info(f"🚀 Starting to scrape with limit={self.limit}, concurrency={self.concurrency}")
         logger.info(f"📊 Will make up to {actual_pages} API calls to get ~{estimated_total_records} records")
         
+        if jsonl_filename:
+            self.jsonl_filename = jsonl_filename
+            self._jsonl_fp = _open_output(jsonl_filename, 'ab')
+            logger.info(f"💾 Streaming records to {jsonl_filename}")
+        if csv_filename:
+            self._open_csv(csv_filename)
+            logger.info(f"📊 Streaming rows to {csv_filename}")
+        
         successful_calls = 0
         failed_calls = 0
         empty_responses = 0
+        collected = 0
         
-        for page in range(actual_pages):
-            offset = page * self.limit
-            
-            logger.info(f"📄 Processing page {page + 1}/{actual_pages} (offset: {offset})")
-            
-            # Fetch page data
-            page_data = self.fetch_page(offset)
-            
-            if page_data:
-                # Handle different response formats
-                if isinstance(page_data, dict) and 'data' in page_data:
-                    records = page_data['data']
-                elif isinstance(page_data, list):
-                    records = page_data
-                else:
-                    records = [page_data] if page_data else []
+        # Reserve every page's slot up front; pages fill their own disjoint slice as they complete
+        base = len(self.all_data)
+        self.all_data.extend([None] * (actual_pages * self.limit))
+        
+        # Start each scrape from a fresh limiter; its condition variable binds to this event loop
+        self._concurrency = AdaptiveConcurrencyLimiter(max_limit=self.concurrency)
+        self._http_version = None
+        
+        try:
+            async with self._make_client() as client:
+                tasks = [asyncio.ensure_future(self._fetch_page_async(client, page * self.limit)) for page in range(actual_pages)]
                 
-                if records:
-                    self.all_data.extend(records)
-                    successful_calls += 1
-                    logger.info(f"✅ Added {len(records)} records. Total so far: {len(self.all_data)}")
-                else:
-                    empty_responses += 1
-                    logger.warning(f"📭 Empty response #{empty_responses} - might have reached the end")
-                    if empty_responses >= 3:  # Stop after 3 consecutive empty responses
-                        logger.info("🛑 Stopping due to consecutive empty responses")
+                # Pages complete out of order; hold early arrivals until the pages before them are in
+                pending = {}
+                next_offset = 0
+                consecutive_empty = 0
+                stop_reason = None
+                
+                for completed, future in enumerate(asyncio.as_completed(tasks), start=1):
+                    offset, records = await future
+                    if records and len(records) > self.limit:
+                        # Anything past the limit would spill into the next page's slots
+                        logger.warning(f"⚠️ Page at offset={offset} returned {len(records)} records, keeping the first {self.limit}")
+                        records = records[:self.limit]
+                    if records:
+                        self.all_data[base + offset:base + offset + len(records)] = records
+                        collected += len(records)
+                    elif records is None:
+                        failed_calls += 1
+                        logger.error(f"❌ Failed to fetch page {offset // self.limit + 1}")
+                        if failed_calls >= 10:  # Stop if too many failures
+                            stop_reason = "🛑 Too many failures, stopping scraper"
+                    pending[offset] = records
+                    
+                    while next_offset in pending:
+                        records = pending.pop(next_offset)
+                        next_offset += self.limit
+                        
+                        if records:
+                            self._write_jsonl(records)
+                            self._write_csv(records)
+                            successful_calls += 1
+                            consecutive_empty = 0
+                        elif records is not None:
+                            empty_responses += 1
+                            consecutive_empty += 1
+                            if consecutive_empty >= 3:  # Stop after 3 consecutive empty responses
+                                stop_reason = "🛑 Stopping due to consecutive empty responses"
+                    
+                    if stop_reason:
+                        logger.warning(stop_reason)
+                        for task in tasks:
+                            task.cancel()
+                        await asyncio.gather(*tasks, return_exceptions=True)
+                        
+                        # Pages that finished past a cancelled gap still go to the streamed outputs
+                        for offset in sorted(pending):
+                            records = pending[offset]
+                            if records:
+                                self._write_jsonl(records)
+                                self._write_csv(records)
+                                successful_calls += 1
                         break
-            else:
-                failed_calls += 1
-                logger.error(f"❌ Failed to fetch page {page + 1}")
-                if failed_calls >= 10:  # Stop if too many failures
-                    logger.error("🛑 Too many failures, stopping scraper")
-                    break
-            
-            # Rate limiting delay
-            if page < actual_pages - 1:
-                time.sleep(self.delay)
-            
-            # Progress update every 20 pages
-            if (page + 1) % 20 == 0:
-                progress_pct = ((page + 1) / actual_pages) * 100
-                logger.info(f"🔄 Progress: {page + 1}/{actual_pages} pages ({progress_pct:.1f}%) - {len(self.all_data)} total records")
+                    
+                    # Progress update every 20 pages
+                    if completed % 20 == 0:
+                        progress_pct = (completed / actual_pages) * 100
+                        logger.info(f"🔄 Progress: {completed}/{actual_pages} pages ({progress_pct:.1f}%) - {collected} total records")
+        finally:
+            self._close_jsonl()
+            self._close_csv()
+            # Drop the slots of failed, empty and short pages
+            self.all_data = [record for record in self.all_data if record is not None]
         
         logger.info(f"✅ Scraping completed!")
         logger.info(f"📊 Total records collected: {len(self.all_data)}")
+        logger.info(f"⚙️ Final concurrency: {self._concurrency.limit}/{self.concurrency}")
         logger.info(f"✅ Successful API calls: {successful_calls}")
+        logger.info(f"📭 Empty responses: {empty_responses}")
         logger.info(f"❌ Failed API calls: {failed_calls}")
         
         return self.all_data
     
+    def scrape_all_pages(self, total_pages: int = 456, jsonl_filename: Optional[str] = None,
+                         csv_filename: Optional[str] = None) -> List[Dict]:
+        """
+        Scrape all pages of data
+        
+        Args:
+            total_pages: Total number of pages to scrape (default based on 456 * 12 records)
+            jsonl_filename: Optional JSON Lines file that records are appended to as pages arrive
+                (zstd-compressed when it ends in .zst)
+            csv_filename: Optional CSV file that rows are appended to as pages arrive
+            
+        Returns:
+            List of all records
+        """
+        return asyncio.run(self.scrape_all_pages_async(total_pages, jsonl_filename, csv_filename))
+    
+    def _write_jsonl(self, records: List[Dict]):
+        """Append records to the open JSON Lines file, one record per line"""
+        if self._jsonl_fp is None:
+            return
+        for record in records:
+            self._jsonl_fp.write(orjson.dumps(record))
+            self._jsonl_fp.write(b'\n')
+        
+        # End a zstd block per page so everything written so far stays decodable after a crash
+        if isinstance(self._jsonl_fp, zstd.ZstdCompressionWriter):
+            self._jsonl_fp.flush(zstd.FLUSH_BLOCK)
+    
+    def _close_jsonl(self):
+        """Flush and close the JSON Lines file if one is open"""
+        if self._jsonl_fp is not None:
+            self._jsonl_fp.close()
+            self._jsonl_fp = None
+    
     def save_to_json(self, filename: Optional[str] = None) -> str:
-        """Save data to JSON file"""
+        """
+        Save data to JSON file
+        
+        When records were streamed to a JSON Lines file during scraping, only the
+        scrape metadata is written here, pointing at that file via 'data_file'.
+        Otherwise the full dump is written zstd-compressed to a .json.zst file.
+        """
+        self._close_jsonl()
+        
         if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"narpm_members_{timestamp}.json"
+            if self.jsonl_filename:
+                base = self.jsonl_filename
+                if base.endswith('.zst'):
+                    base = base[:-len('.zst')]
+                filename = os.path.splitext(base)[0] + '.json'
+            else:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"narpm_members_{timestamp}.json.zst"
+        
+        payload = {
+            'scraped_at': datetime.now().isoformat(),
+            'total_records': len(self.all_data),
+            'scraper_config': {
+                'limit': self.limit,
+                'delay': self.delay,
+                'concurrency': self.concurrency,
+                'cache_ttl_seconds': self.cache_ttl_seconds
+            }
+        }
+        if self.jsonl_filename:
+            payload['data_file'] = self.jsonl_filename
+        else:
+            payload['data'] = self.all_data
         
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'scraped_at': datetime.now().isoformat(),
-                    'total_records': len(self.all_data),
-                    'scraper_config': {
-                        'limit': self.limit,
-                        'delay': self.delay
-                    },
-                    'data': self.all_data
-                }, f, indent=2, ensure_ascii=False)
+            with _open_output(filename) as f:
+                f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             
             file_size = os.path.getsize(filename) / (1024 * 1024)  # MB
             logger.info(f"💾 JSON saved: {filename} ({file_size:.1f} MB)")
@@ -212,28 +801,137 @@ class NARPMScraper:
             logger.error(f"❌ Failed to save JSON: {str(e)}")
             return ""
     
+    def _open_csv(self, filename: str):
+        """Open the CSV output so rows can be written as pages arrive"""
+        self.csv_filename = filename
+        self._csv_fp = open(filename, 'w', newline='', encoding='utf-8')
+        self._csv_writer = csv.writer(self._csv_fp)
+        self._csv_header_written = False
+        self._csv_rows = 0
+    
+    def _learn_csv_header(self, records: List[Dict]):
+        """Fix the CSV columns from the first non-empty page (the API's records are homogeneous)"""
+        if self._csv_header is None and records:
+            self._csv_header = sorted({key for record in records if isinstance(record, dict) for key in record})
+    
+    @staticmethod
+    def _csv_records(records: List) -> List[Dict]:
+        """Drop records that aren't dicts, which have no fields to put in CSV columns"""
+        rows = [record for record in records if isinstance(record, dict)]
+        if len(rows) < len(records):
+            logger.warning(f"Skipping {len(records) - len(rows)} non-dict records in the CSV")
+        return rows
+    
+    def _write_csv(self, records: List[Dict]):
+        """
+        Append records to the open CSV file
+        
+        Fields missing from the learned header go to a '<name>_extras.csv' sidecar
+        as (row, field, value) triples instead of widening the main file.
+        Records that aren't dicts are skipped.
+        """
+        if self._csv_writer is None:
+            return
+        
+        records = self._csv_records(records)
+        self._learn_csv_header(records)
+        header = self._csv_header
+        if not header:
+            return
+        if not self._csv_header_written:
+            self._csv_writer.writerow(header)
+            self._csv_header_written = True
+        
+        header_keys = set(header)
+        for record in records:
+            self._csv_writer.writerow([record.get(key, '') for key in header])
+            extra_keys = record.keys() - header_keys
+            if extra_keys:
+                self._write_csv_extras([(self._csv_rows, key, record[key]) for key in sorted(extra_keys)])
+            self._csv_rows += 1
+    
+    def _write_csv_parallel(self, records: List[Dict]):
+        """Append records to the open CSV file, encoding chunks in a process pool"""
+        workers = os.cpu_count() or 1
+        if workers < 2:
+            # A single worker only adds pickling overhead
+            self._write_csv(records)
+            return
+        
+        records = self._csv_records(records)
+        self._learn_csv_header(records)
+        header = self._csv_header
+        if not header:
+            return
+        if not self._csv_header_written:
+            self._csv_writer.writerow(header)
+            self._csv_header_written = True
+        
+        chunk_size = -(-len(records) // workers)
+        chunks = [(records[i:i + chunk_size], header) for i in range(0, len(records), chunk_size)]
+        
+        with Pool(workers) as pool:
+            # imap keeps chunk order so rows land in the same order as all_data
+            for (chunk, _), (encoded, extras) in zip(chunks, pool.imap(_encode_csv_chunk, chunks)):
+                self._csv_fp.write(encoded)
+                if extras:
+                    self._write_csv_extras([(self._csv_rows + row, key, value) for row, key, value in extras])
+                self._csv_rows += len(chunk)
+    
+    def _write_csv_extras(self, extras: List[Tuple[int, str, Any]]):
+        """Record (row, field, value) triples for fields outside the CSV header in the extras sidecar"""
+        if self._csv_extras_writer is None:
+            extras_filename = os.path.splitext(self.csv_filename)[0] + '_extras.csv'
+            self._csv_extras_fp = open(extras_filename, 'w', newline='', encoding='utf-8')
+            self._csv_extras_writer = csv.writer(self._csv_extras_fp)
+            self._csv_extras_writer.writerow(['row', 'field', 'value'])
+            logger.warning(f"New fields outside the CSV header, writing them to {extras_filename}")
+        
+        self._csv_extras_writer.writerows(extras)
+    
+    def _close_csv(self):
+        """Flush and close the CSV file and its extras sidecar if open"""
+        if self._csv_fp is not None:
+            self._csv_fp.close()
+            self._csv_fp = None
+            self._csv_writer = None
+        if self._csv_extras_fp is not None:
+            self._csv_extras_fp.close()
+            self._csv_extras_fp = None
+            self._csv_extras_writer = None
+    
     def save_to_csv(self, filename: Optional[str] = None) -> str:
-        """Save data to CSV file"""
+        """
+        Save data to CSV file
+        
+        When rows were already streamed to a CSV file during scraping, this just
+        finalizes that file and the filename argument is ignored.
+        """
         if not self.all_data:
             logger.warning("No data to save")
             return ""
         
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"narpm_members_{timestamp}.csv"
-        
         try:
-            # Get all unique keys from all records
-            all_keys = set()
-            for record in self.all_data:
-                if isinstance(record, dict):
-                    all_keys.update(record.keys())
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                if all_keys:
-                    writer = csv.DictWriter(f, fieldnames=sorted(all_keys))
-                    writer.writeheader()
-                    writer.writerows(self.all_data)
+            if self.csv_filename is not None:
+                if filename is not None and filename != self.csv_filename:
+                    logger.warning(f"CSV was already streamed to {self.csv_filename}, ignoring {filename}")
+                filename = self.csv_filename
+                self._close_csv()
+                self.csv_filename = None
+            else:
+                if filename is None:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    filename = f"narpm_members_{timestamp}.csv"
+                
+                self._open_csv(filename)
+                try:
+                    if len(self.all_data) >= PARALLEL_CSV_MIN_ROWS:
+                        self._write_csv_parallel(self.all_data)
+                    else:
+                        self._write_csv(self.all_data)
+                finally:
+                    self._close_csv()
+                    self.csv_filename = None
             
             file_size = os.path.getsize(filename) / (1024 * 1024)  # MB
             logger.info(f"📊 CSV saved: {filename} ({file_size:.1f} MB)")
@@ -253,7 +951,9 @@ class NARPMScraper:
             'sample_record': self.all_data[0] if self.all_data else None,
             'scraper_config': {
                 'limit': self.limit,
-                'delay': self.delay
+                'delay': self.delay,
+                'concurrency': self.concurrency,
+                'cache_ttl_seconds': self.cache_ttl_seconds
             }
         }
         
@@ -262,18 +962,25 @@ class NARPMScraper:
             stats['fields'] = list(self.all_data[0].keys())
             stats['field_count'] = len(stats['fields'])
             
-            # Get field value counts for interesting fields
+            # Get field value counts for interesting fields in a single pass over the records
             field_stats = {}
-            interesting_fields = ['state', 'status', 'type', 'category']
+            interesting_fields = [field for field in ['state', 'status', 'type', 'category'] if field in stats['fields']]
+            seen = {field: set() for field in interesting_fields}
+            samples = {field: [] for field in interesting_fields}
+            for record in self.all_data:
+                for field in interesting_fields:
+                    value = record.get(field)
+                    if value and value not in seen[field]:
+                        seen[field].add(value)
+                        if len(samples[field]) < 5:  # First 5 unique values
+                            samples[field].append(value)
+            
             for field in interesting_fields:
-                if field in stats['fields']:
-                    values = [record.get(field) for record in self.all_data if record.get(field)]
-                    if values:
-                        unique_values = list(set(values))
-                        field_stats[field] = {
-                            'unique_count': len(unique_values),
-                            'sample_values': unique_values[:5]  # First 5 unique values
-                        }
+                if seen[field]:
+                    field_stats[field] = {
+                        'unique_count': len(seen[field]),
+                        'sample_values': samples[field]
+                    }
             
             if field_stats:
                 stats['field_statistics'] = field_stats
@@ -328,67 +1035,81 @@ def main():
         print("❌ Scraping cancelled")
         return
     
-    # Initialize and run scraper
-    scraper = NARPMScraper(limit=limit, delay=delay)
-    
-    # Start scraping
-    start_time = time.time()
-    print(f"\n⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    data = scraper.scrape_all_pages(total_pages=456)
-    
-    end_time = time.time()
-    duration = end_time - start_time
-    
-    if data:
-        # Save results based on user choice
-        files_saved = []
-        
-        if export_choice in ['1', '3', '']:  # JSON
-            json_file = scraper.save_to_json()
-            if json_file:
-                files_saved.append(json_file)
+    log_listener = setup_logging()
+    try:
+        # Initialize and run scraper
+        scraper = NARPMScraper(limit=limit, delay=delay)
         
-        if export_choice in ['2', '3', '']:  # CSV
-            csv_file = scraper.save_to_csv()
-            if csv_file:
-                files_saved.append(csv_file)
+        # Start scraping
+        start_time = time.time()
+        print(f"\n⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Show results
-        stats = scraper.get_summary_stats()
+        # Stream records to the requested output files while scraping
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        jsonl_file = f"narpm_members_{timestamp}.jsonl.zst" if export_choice in ['1', '3', ''] else None
+        csv_file = f"narpm_members_{timestamp}.csv" if export_choice in ['2', '3', ''] else None
         
-        print("\n" + "=" * 60)
-        print("🎉 SCRAPING COMPLETED SUCCESSFULLY!")
-        print("=" * 60)
-        print(f"📊 Total Records: {stats.get('total_records', 0):,}")
-        print(f"⏱️  Total Time: {duration:.1f} seconds ({duration/60:.1f} minutes)")
-        print(f"📈 Rate: {stats.get('total_records', 0)/duration:.1f} records/second")
-        print(f"💾 Files Saved: {', '.join(files_saved)}")
-        print(f"📝 Log File: narpm_scraper.log")
+        data = scraper.scrape_all_pages(total_pages=456, jsonl_filename=jsonl_file, csv_filename=csv_file)
         
-        if stats.get('field_statistics'):
-            print(f"\n📋 Field Statistics:")
-            for field, info in stats.get('field_statistics', {}).items():
-                print(f"   • {field}: {info['unique_count']} unique values")
+        end_time = time.time()
+        duration = end_time - start_time
         
-        if stats.get('sample_record'):
-            print(f"\n🔍 Sample Record Fields ({len(stats.get('fields', []))} total):")
-            for field in stats.get('fields', [])[:10]:
-                print(f"   • {field}")
-            if len(stats.get('fields', [])) > 10:
-                print(f"   ... and {len(stats.get('fields', [])) - 10} more fields")
+        if data:
+            # Save results based on user choice
+            files_saved = []
+            
+            if export_choice in ['1', '3', '']:  # JSON
+                files_saved.append(jsonl_file)
+                json_file = scraper.save_to_json()
+                if json_file:
+                    files_saved.append(json_file)
+            
+            if export_choice in ['2', '3', '']:  # CSV
+                csv_file = scraper.save_to_csv()
+                if csv_file:
+                    files_saved.append(csv_file)
+            
+            # Show results
+            stats = scraper.get_summary_stats()
+            
+            print("\n" + "=" * 60)
+            print("🎉 SCRAPING COMPLETED SUCCESSFULLY!")
+            print("=" * 60)
+            print(f"📊 Total Records: {stats.get('total_records', 0):,}")
+            print(f"⏱️  Total Time: {duration:.1f} seconds ({duration/60:.1f} minutes)")
+            print(f"📈 Rate: {stats.get('total_records', 0)/duration:.1f} records/second")
+            print(f"💾 Files Saved: {', '.join(files_saved)}")
+            print(f"📝 Log File: narpm_scraper.log")
+            
+            if stats.get('field_statistics'):
+                print(f"\n📋 Field Statistics:")
+                for field, info in stats.get('field_statistics', {}).items():
+                    print(f"   • {field}: {info['unique_count']} unique values")
+            
+            if stats.get('sample_record'):
+                print(f"\n🔍 Sample Record Fields ({len(stats.get('fields', []))} total):")
+                for field in stats.get('fields', [])[:10]:
+                    print(f"   • {field}")
+                if len(stats.get('fields', [])) > 10:
+                    print(f"   ... and {len(stats.get('fields', [])) - 10} more fields")
+            
+            print("\n✅ Check the log file for detailed scraping information.")
         
-        print("\n✅ Check the log file for detailed scraping information.")
-    
-    else:
-        print("❌ No data was scraped. Check narpm_scraper.log for detailed error information.")
+        else:
+            print("❌ No data was scraped. Check narpm_scraper.log for detailed error information.")
+    finally:
+        stop_logging(log_listener)
 
 def quick_test():
     """Quick test function to verify API connectivity"""
     print("🧪 Running API connectivity test...")
     
-    scraper = NARPMScraper(limit=5)
-    test_data = scraper.fetch_page(0)
+    log_listener = setup_logging()
+    try:
+        scraper = NARPMScraper(limit=5)
+        test_data = scraper.fetch_page(0)
+    finally:
+        stop_logging(log_listener)
     
     if test_data:
         print("✅ API test successful!")
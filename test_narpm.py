@@ -0,0 +1,305 @@
+"""Regression checks for the NARPM scraper, run against a mocked API"""
+
+import logging
+import os
+import time
+
+import httpx
+import orjson
+import tenacity
+import zstandard as zstd
+
+import narpm
+
+
+def _mock_api(total_records: int = 250, status: int = 200, calls: list = None, overfill: int = 0, respond=None):
+    """
+    httpx transport serving `total_records` fake members with offset/limit paging
+    
+    `respond(request)` may return a Response to override the default page for that request.
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        if calls is not None:
+            calls.append(request.url.params['offset'])
+        if respond is not None:
+            response = respond(request)
+            if response is not None:
+                return response
+        if status != 200:
+            return httpx.Response(status)
+        offset = int(request.url.params['offset'])
+        limit = int(request.url.params['limit']) + overfill
+        records = [{'member_number': str(i), 'state': 'CA'} for i in range(offset, min(offset + limit, total_records))]
+        return httpx.Response(200, content=orjson.dumps({'data': records}))
+    return httpx.MockTransport(handler)
+
+
+def _scraper(monkeypatch, tmp_path, limit: int, delay: float = 0, **api) -> narpm.NARPMScraper:
+    monkeypatch.chdir(tmp_path)
+    transport = _mock_api(**api)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(narpm.httpx, 'AsyncClient', lambda **kwargs: real_client(transport=transport, headers=kwargs.get('headers')))
+    return narpm.NARPMScraper(limit=limit, delay=delay, cache_ttl_seconds=0)
+
+
+def test_page_stream_parser_builds_records_across_chunks():
+    body = orjson.dumps({'data': [{'a': 1, 'b': [2, {'c': 3}]}, {'a': 2}], 'total': 2})
+    parser = narpm._PageStreamParser()
+    for i in range(0, len(body), 3):
+        parser.feed(body[i:i + 3])
+    assert parser.close() == {'data': [{'a': 1, 'b': [2, {'c': 3}]}, {'a': 2}], 'total': 2}
+
+
+def test_streamed_page_is_cached_as_raw_body(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=narpm.STREAM_PARSE_MIN_LIMIT)
+    scraper.cache_ttl_seconds = 60
+    data = scraper.fetch_page(0)
+    
+    assert (tmp_path / scraper._cache_path(0)).read_bytes() == orjson.dumps(data)
+    assert not list((tmp_path / scraper.cache_dir).glob('*.tmp'))
+
+
+def test_scrape_streamed_pages(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=narpm.STREAM_PARSE_MIN_LIMIT)
+    data = scraper.scrape_all_pages(total_pages=25)
+    assert [record['member_number'] for record in data] == [str(i) for i in range(250)]
+
+
+def test_scrape_buffered_pages(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=20)
+    data = scraper.scrape_all_pages(total_pages=25)
+    assert [record['member_number'] for record in data] == [str(i) for i in range(250)]
+
+
+# The stop tests pace requests so the mocked API doesn't answer every page before the budget is checked
+def test_scrape_stops_after_consecutive_empty_pages(monkeypatch, tmp_path):
+    calls = []
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, delay=0.01, total_records=40, calls=calls)
+    data = scraper.scrape_all_pages(total_pages=100)
+    assert len(data) == 40
+    assert len(calls) < 60
+
+
+def test_scrape_stops_after_too_many_failures(monkeypatch, tmp_path):
+    calls = []
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, delay=0.01, status=404, calls=calls)
+    data = scraper.scrape_all_pages(total_pages=100)
+    assert data == []
+    assert len(calls) < 60
+
+
+def test_save_to_csv_parallel_matches_serial(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    records = [{'member_number': str(i), 'state': 'CA'} for i in range(50)] + [{'member_number': '50', 'city': 'X'}]
+    
+    serial = narpm.NARPMScraper()
+    serial.all_data = list(records)
+    serial.save_to_csv('serial.csv')
+    
+    monkeypatch.setattr(narpm, 'PARALLEL_CSV_MIN_ROWS', 1)
+    for cpus in (1, 4):
+        monkeypatch.setattr(narpm.os, 'cpu_count', lambda: cpus)
+        parallel = narpm.NARPMScraper()
+        parallel.all_data = list(records)
+        parallel.save_to_csv(f'parallel_{cpus}.csv')
+        assert (tmp_path / f'parallel_{cpus}.csv').read_bytes() == (tmp_path / 'serial.csv').read_bytes()
+
+
+def test_stream_parsers_match_full_decode():
+    bodies = [
+        {'data': [{'a': 1.5}, {'a': 2}], 'total': 2},
+        [{'a': 1}, {'a': 2}],
+        {'meta': 1},
+        {'data': None},
+        7,
+    ]
+    
+    for expected in bodies:
+        parser = narpm._PageStreamParser()
+        parser.feed(b'  ' + orjson.dumps(expected))
+        assert parser.close() == expected
+
+
+def test_scrape_caps_oversized_pages(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, overfill=5)
+    data = scraper.scrape_all_pages(total_pages=25)
+    assert [record['member_number'] for record in data] == [str(i) for i in range(250)]
+
+
+def test_save_to_csv_honours_filename_on_repeat_saves(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=20)
+    scraper.scrape_all_pages(total_pages=25, csv_filename='streamed.csv')
+    
+    assert scraper.save_to_csv() == 'streamed.csv'
+    assert scraper.save_to_csv('again.csv') == 'again.csv'
+    assert (tmp_path / 'again.csv').read_bytes() == (tmp_path / 'streamed.csv').read_bytes()
+
+
+def test_scrape_counts_null_data_page_as_failure(monkeypatch, tmp_path, caplog):
+    def null_page(request):
+        if request.url.params['offset'] == '20':
+            return httpx.Response(200, content=b'{"data": null}')
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, respond=null_page)
+    data = scraper.scrape_all_pages(total_pages=25)
+    
+    assert [record['member_number'] for record in data] == [str(i) for i in range(250) if not 20 <= i < 40]
+    assert "Failed to fetch page 2" in caplog.text
+
+
+def test_extract_records_handles_malformed_envelopes():
+    assert narpm.NARPMScraper._extract_records({'data': None}) == []
+    assert narpm.NARPMScraper._extract_records({'data': 'oops'}) == []
+    assert narpm.NARPMScraper._extract_records({'meta': 1}) == [{'meta': 1}]
+    assert narpm.NARPMScraper._extract_records([{'a': 1}]) == [{'a': 1}]
+
+
+def test_async_state_is_initialized_before_scraping():
+    scraper = narpm.NARPMScraper()
+    assert scraper._concurrency.limit >= 1
+    assert scraper._http_version is None
+
+
+def test_fetch_page_uses_the_httpx_client(monkeypatch, tmp_path):
+    scraper = _scraper(monkeypatch, tmp_path, limit=5)
+    page = scraper.fetch_page(10)
+    assert [record['member_number'] for record in page['data']] == ['10', '11', '12', '13', '14']
+
+
+def test_rate_limited_fetch_honours_retry_after(monkeypatch, tmp_path):
+    calls = []
+    
+    def rate_limit_once(request):
+        if len(calls) == 1:
+            return httpx.Response(429, headers={'Retry-After': '0'})
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=5, calls=calls, respond=rate_limit_once)
+    page = scraper.fetch_page(0)
+    
+    assert calls == ['0', '0']
+    assert len(page['data']) == 5
+
+
+def test_parse_retry_after():
+    assert narpm._parse_retry_after('7') == 7
+    assert narpm._parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert narpm._parse_retry_after('soon') is None
+    assert narpm._parse_retry_after(None) is None
+
+
+def test_scrape_accepts_bare_list_pages(monkeypatch, tmp_path):
+    def bare_list(request):
+        offset = int(request.url.params['offset'])
+        return httpx.Response(200, content=orjson.dumps([{'member_number': str(i)} for i in range(offset, min(offset + 20, 40))]))
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, respond=bare_list)
+    data = scraper.scrape_all_pages(total_pages=2)
+    assert [record['member_number'] for record in data] == [str(i) for i in range(40)]
+
+
+def test_streamed_csv_skips_non_dict_records(monkeypatch, tmp_path):
+    def mixed_page(request):
+        if request.url.params['offset'] == '0':
+            return httpx.Response(200, content=orjson.dumps([{'member_number': '0'}, 'stray', {'member_number': '1'}]))
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=20, total_records=40, respond=mixed_page)
+    scraper.scrape_all_pages(total_pages=2, csv_filename='mixed.csv')
+    scraper.save_to_csv()
+    
+    rows = (tmp_path / 'mixed.csv').read_text().splitlines()
+    assert rows[:3] == ['member_number', '0', '1']
+    assert len(rows) == 1 + 2 + 20
+
+
+def test_logging_is_set_up_on_demand_and_stopped(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    root_handlers = list(logging.getLogger().handlers)
+    
+    listener = narpm.setup_logging()
+    narpm.logger.warning("queued record")
+    narpm.stop_logging(listener)
+    
+    assert listener._thread is None
+    assert logging.getLogger().handlers == root_handlers
+    assert "queued record" in (tmp_path / 'narpm_scraper.log').read_text(encoding='utf-8')
+
+
+def test_cache_hit_skips_the_network(monkeypatch, tmp_path):
+    calls = []
+    scraper = _scraper(monkeypatch, tmp_path, limit=5, calls=calls)
+    scraper.cache_ttl_seconds = 60
+    
+    first = scraper.fetch_page(0)
+    assert scraper.fetch_page(0) == first
+    assert calls == ['0']
+
+
+def test_expired_cache_entry_is_refetched(monkeypatch, tmp_path):
+    calls = []
+    scraper = _scraper(monkeypatch, tmp_path, limit=5, calls=calls)
+    scraper.cache_ttl_seconds = 60
+    
+    scraper.fetch_page(0)
+    stale = time.time() - 61
+    os.utime(scraper._cache_path(0), (stale, stale))
+    scraper.fetch_page(0)
+    assert calls == ['0', '0']
+
+
+def test_corrupt_cache_entry_falls_back_to_a_fetch(monkeypatch, tmp_path):
+    calls = []
+    scraper = _scraper(monkeypatch, tmp_path, limit=5, calls=calls)
+    scraper.cache_ttl_seconds = 60
+    os.makedirs(scraper.cache_dir)
+    (tmp_path / scraper._cache_path(0)).write_bytes(b'{"data": [')
+    
+    page = scraper.fetch_page(0)
+    assert calls == ['0']
+    assert len(page['data']) == 5
+    assert orjson.loads((tmp_path / scraper._cache_path(0)).read_bytes()) == page
+
+
+def test_rate_limiter_paces_requests_after_a_burst():
+    limiter = narpm.RateLimiter(rate=20, max_tokens=2)
+    
+    started = time.monotonic()
+    for _ in range(2):
+        limiter.wait_for_token()
+    assert time.monotonic() - started < 0.05
+    
+    for _ in range(3):
+        limiter.wait_for_token()
+    assert time.monotonic() - started >= 0.14
+
+
+def test_server_error_is_retried(monkeypatch, tmp_path):
+    calls = []
+    
+    def unavailable_once(request):
+        if len(calls) == 1:
+            return httpx.Response(503)
+    
+    monkeypatch.setattr(narpm.NARPMScraper._do_fetch_async.retry, 'wait', tenacity.wait_none())
+    scraper = _scraper(monkeypatch, tmp_path, limit=5, calls=calls, respond=unavailable_once)
+    page = scraper.fetch_page(0)
+    
+    assert calls == ['0', '0']
+    assert len(page['data']) == 5
+
+
+def test_zst_outputs_decompress(monkeypatch, tmp_path):
+    def decompress(path):
+        with open(path, 'rb') as f:
+            return zstd.ZstdDecompressor().stream_reader(f).read()
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=20)
+    data = scraper.scrape_all_pages(total_pages=25, jsonl_filename='members.jsonl.zst')
+    scraper.save_to_json()
+    lines = decompress(tmp_path / 'members.jsonl.zst').splitlines()
+    assert [orjson.loads(line) for line in lines] == data
+    
+    scraper = _scraper(monkeypatch, tmp_path, limit=20)
+    data = scraper.scrape_all_pages(total_pages=25)
+    filename = scraper.save_to_json()
+    assert filename.endswith('.json.zst')
+    assert orjson.loads(decompress(tmp_path / filename))['data'] == data